@@ -4,7 +4,7 @@ Automated Excel Reporting System
 
 This script:
 1. Reads sales data from SQLite database
-2. Processes data using pandas
+2. Summarizes data using pandas
 3. Generates formatted Excel report with charts
 4. Sends report via email
 
@@ -13,80 +13,146 @@ Date: January 2026
 """
 
 import sqlite3
+import csv
 import pandas as pd
 import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-from openpyxl import load_workbook
+from email.message import EmailMessage
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.chart import BarChart, LineChart, Reference
-from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
+from openpyxl.worksheet.cell_range import CellRange
 import configparser
-from datetime import datetime
+import functools
+import gzip
+import io
+from datetime import date, datetime
 import os
+import shutil
 import sys
+import warnings
+
+# Shared cell styles (openpyxl stores each distinct style only once)
+TITLE_FONT = Font(size=16, bold=True, color='FFFFFF')
+HEADER_FONT = Font(bold=True, color='FFFFFF')
+BOLD_FONT = Font(bold=True)
+ITALIC_FONT = Font(italic=True)
+SUMMARY_FILL = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
+DATA_FILL = PatternFill(start_color='70AD47', end_color='70AD47', fill_type='solid')
+CENTER = Alignment(horizontal='center')
+
+# Header styles registered once per workbook and referenced by name
+SUMMARY_HEADER_STYLE = NamedStyle(
+    name='Summary Header', font=HEADER_FONT, fill=SUMMARY_FILL, alignment=CENTER
+)
+DATA_HEADER_STYLE = NamedStyle(
+    name='Data Header', font=HEADER_FONT, fill=DATA_FILL, alignment=CENTER
+)
+
+# Above this many rows the raw data is written to a CSV next to the report
+# instead of a Data sheet (the C csv writer is far faster than XML cells)
+DATA_CSV_THRESHOLD = 200_000
+
+# sale_date is stored as days since 1970-01-01
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
 
 # ============================================
 # SECTION 1: CONFIGURATION LOADING
 # ============================================
+CONFIG_PATH = 'config.ini'
+
+@functools.lru_cache(maxsize=1)
+def _load_config_cached(path, mtime):
+    """
+    Parse the config file; memoized on (path, mtime) by load_config.
+    """
+    config = configparser.ConfigParser()
+    config.read(path)
+    return config
+
 def load_config():
     """
     Load configuration from config.ini file.
     Returns config object with database and email settings.
+    
+    The parsed file is cached and only re-read when its mtime changes.
     """
     print("[INFO] Loading configuration...")
-    config = configparser.ConfigParser()
     
     # Check if config file exists
-    if not os.path.exists('config.ini'):
+    if not os.path.exists(CONFIG_PATH):
         print("[ERROR] config.ini file not found!")
         print("[INFO] Please create config.ini file with your settings.")
         sys.exit(1)
     
-    config.read('config.ini')
+    config = _load_config_cached(CONFIG_PATH, os.path.getmtime(CONFIG_PATH))
     print("[SUCCESS] Configuration loaded successfully.")
     return config
 
 # ============================================
 # SECTION 2: DATABASE CONNECTION & QUERYING
 # ============================================
-def fetch_sales_data(db_path):
+def connect_database(db_path):
     """
-    Connect to SQLite database and fetch sales data.
+    Open a read-only tuned connection to the SQLite database.
     
     Args:
         db_path: Path to SQLite database file
     
     Returns:
-        DataFrame with sales data
+        sqlite3 Connection object
     """
     print(f"[INFO] Connecting to database: {db_path}")
     
     try:
         # Create connection to SQLite database
         conn = sqlite3.connect(db_path)
-        print("[SUCCESS] Database connection established.")
         
-        # SQL Query: Select all sales records
+        # Reporting never writes; memory-map the file and use a 64MB page cache
+        conn.execute('PRAGMA query_only=1')
+        conn.execute('PRAGMA mmap_size=268435456')
+        conn.execute('PRAGMA cache_size=-65536')
+        
+        # sale_date is stored as days since 1970-01-01; databases created
+        # before that change declare it TEXT and hold dates that would be
+        # misread (same schema check as setup_database.py)
+        columns = {row[1]: row[2] for row in conn.execute('PRAGMA table_info(sales)')}
+        if columns.get('sale_date', '').upper() != 'INTEGER':
+            conn.close()
+            print("[ERROR] sales.sale_date uses the old TEXT column type.")
+            print("[INFO] Delete the database file and run setup_database.py again.")
+            sys.exit(1)
+        
+        print("[SUCCESS] Database connection established.")
+        return conn
+    
+    except Exception as e:
+        print(f"[ERROR] Failed to connect to database: {e}")
+        sys.exit(1)
+
+def fetch_sales_data(conn):
+    """
+    Fetch the sales columns needed for the product summary.
+    
+    Args:
+        conn: Open SQLite database connection
+    
+    Returns:
+        DataFrame with sales data
+    """
+    try:
+        # SQL Query: Select all sales records (summary columns only)
         query = """
         SELECT 
-            sale_id,
-            sale_date,
             product_name,
             category,
             quantity,
-            unit_price,
             total_amount
         FROM sales
-        ORDER BY sale_date DESC
         """
         
         print("[INFO] Executing SQL query to fetch sales data...")
         df = pd.read_sql_query(query, conn)
-        
-        # Close database connection
-        conn.close()
         print(f"[SUCCESS] Fetched {len(df)} sales records.")
         
         return df
@@ -95,232 +161,310 @@ def fetch_sales_data(db_path):
         print(f"[ERROR] Failed to fetch data from database: {e}")
         sys.exit(1)
 
-def get_sales_summary(db_path):
+def fetch_report_rows(conn, text_dates=False):
     """
-    Get aggregated sales summary using SQL GROUP BY.
+    Query the raw sales rows for the Data sheet, formatted by SQLite.
+    
+    Rows are read straight from the cursor into the report, so no
+    DataFrame is built for the largest output.
     
     Args:
-        db_path: Path to SQLite database file
+        conn: Open SQLite database connection
+        text_dates: Return sale_date as 'YYYY-MM-DD' text (for CSV) instead
+            of the stored day number (converted to real dates for Excel)
     
     Returns:
-        DataFrame with summary statistics
+        sqlite3 Cursor over the formatted rows
     """
-    print("[INFO] Calculating sales summary...")
+    if text_dates:
+        sale_date_sql = "date(sale_date * 86400, 'unixepoch')"
+    else:
+        sale_date_sql = "sale_date"
     
-    try:
-        conn = sqlite3.connect(db_path)
-        
-        # SQL Query: Aggregate sales by product
-        summary_query = """
-        SELECT 
-            product_name,
-            category,
-            COUNT(*) as total_sales,
-            SUM(quantity) as total_quantity,
-            SUM(total_amount) as total_revenue,
-            AVG(total_amount) as avg_sale_amount
-        FROM sales
-        GROUP BY product_name, category
-        ORDER BY total_revenue DESC
-        """
-        
-        df_summary = pd.read_sql_query(summary_query, conn)
-        conn.close()
-        
-        print(f"[SUCCESS] Summary calculated for {len(df_summary)} products.")
-        return df_summary
+    # SQL Query: All sales records, newest first. ORDER BY names the table
+    # column (not the formatted alias) so idx_sales_date serves the sort
+    query = f"""
+    SELECT 
+        sale_id,
+        {sale_date_sql} AS sale_date,
+        product_name,
+        category,
+        quantity,
+        ROUND(unit_price, 2) AS unit_price,
+        ROUND(total_amount, 2) AS total_amount,
+        strftime('%Y-%m', sale_date * 86400, 'unixepoch') AS month,
+        CASE strftime('%w', sale_date * 86400, 'unixepoch')
+            WHEN '0' THEN 'Sunday'
+            WHEN '1' THEN 'Monday'
+            WHEN '2' THEN 'Tuesday'
+            WHEN '3' THEN 'Wednesday'
+            WHEN '4' THEN 'Thursday'
+            WHEN '5' THEN 'Friday'
+            ELSE 'Saturday'
+        END AS day_of_week
+    FROM sales
+    ORDER BY sales.sale_date DESC
+    """
     
-    except Exception as e:
-        print(f"[ERROR] Failed to calculate summary: {e}")
-        sys.exit(1)
+    print("[INFO] Executing SQL query to fetch report rows...")
+    return conn.execute(query)
 
 # ============================================
 # SECTION 3: DATA PROCESSING WITH PANDAS
 # ============================================
-def process_data(df):
+def aggregate_by_product(grouped, engine):
     """
-    Clean and process sales data using pandas.
+    Run the summary reductions on a product/category groupby.
     
     Args:
-        df: Raw sales DataFrame
+        grouped: DataFrameGroupBy over product_name and category
+        engine: pandas groupby engine (None for the default, or 'numba')
     
     Returns:
-        Processed DataFrame
+        DataFrame with summary statistics, highest revenue first
     """
-    print("[INFO] Processing data with pandas...")
+    engine_kwargs = {'nopython': True, 'parallel': True} if engine == 'numba' else None
+    reduce_kwargs = {'engine': engine, 'engine_kwargs': engine_kwargs}
     
-    # Create a copy to avoid modifying original
-    df_processed = df.copy()
+    return (
+        pd.DataFrame({
+            'total_sales': grouped.size(),
+            'total_quantity': grouped['quantity'].sum(**reduce_kwargs),
+            'total_revenue': grouped['total_amount'].sum(**reduce_kwargs),
+            'avg_sale_amount': grouped['total_amount'].mean(**reduce_kwargs),
+        })
+        .sort_values('total_revenue', ascending=False)
+        .reset_index()
+    )
+
+def summarize_sales(df, engine=None):
+    """
+    Aggregate sales by product from the already fetched raw data.
     
-    # Convert sale_date to datetime format
-    df_processed['sale_date'] = pd.to_datetime(df_processed['sale_date'])
+    The default (Cython) engine is right for this script, which runs in
+    a fresh process each time. engine='numba' JIT-compiles the reductions
+    on every run (several seconds), so it only pays off on tables with
+    millions of rows; it falls back to the default if numba is unusable.
     
-    # Add derived columns
-    df_processed['month'] = df_processed['sale_date'].dt.strftime('%Y-%m')
-    df_processed['day_of_week'] = df_processed['sale_date'].dt.day_name()
+    Args:
+        df: Raw sales DataFrame
+        engine: None for the default groupby engine, or 'numba'
+    
+    Returns:
+        DataFrame with summary statistics
+    """
+    print("[INFO] Calculating sales summary...")
     
-    # Round monetary values to 2 decimal places
-    df_processed['unit_price'] = df_processed['unit_price'].round(2)
-    df_processed['total_amount'] = df_processed['total_amount'].round(2)
+    grouped = df.groupby(['product_name', 'category'], sort=False, observed=True)
     
-    # Remove any duplicate records (if any)
-    df_processed = df_processed.drop_duplicates()
+    if engine == 'numba':
+        try:
+            with warnings.catch_warnings():
+                # Harmless cast warning raised inside pandas' numba executor
+                warnings.filterwarnings('ignore', message='unsafe cast from uint64')
+                df_summary = aggregate_by_product(grouped, 'numba')
+        except ImportError as e:
+            print(f"[WARNING] numba engine unavailable ({e}); using default engine.")
+            df_summary = aggregate_by_product(grouped, None)
+    else:
+        df_summary = aggregate_by_product(grouped, None)
     
-    print(f"[SUCCESS] Data processing complete. Shape: {df_processed.shape}")
-    return df_processed
+    print(f"[SUCCESS] Summary calculated for {len(df_summary)} products.")
+    return df_summary
 
 # ============================================
 # SECTION 4: EXCEL REPORT GENERATION
 # ============================================
-def generate_excel_report(df_data, df_summary, output_file):
+def build_header_row(sheet, columns, style):
+    """
+    Build a header row whose cells all share one registered style.
+    
+    Args:
+        sheet: Write-only worksheet the row will be appended to
+        columns: Column names for the header
+        style: NamedStyle already added to the workbook
+    
+    Returns:
+        List of styled WriteOnlyCell objects
+    """
+    header = []
+    for name in columns:
+        cell = WriteOnlyCell(sheet, value=name)
+        cell.style = style.name
+        header.append(cell)
+    return header
+
+def generate_excel_report(conn, df_summary, output_file, run_ts):
     """
     Generate formatted Excel report with multiple sheets and charts.
     
+    The workbook is built in openpyxl write_only mode: rows are streamed
+    to disk as they are appended and the file is saved exactly once.
+    If lxml is installed, openpyxl detects it and uses its incremental
+    xmlfile writer, which streams XML into the zip instead of building a
+    tree in memory (roughly 2-3x faster).
+    The Data sheet is filled directly from a SQLite cursor. When there are
+    more than DATA_CSV_THRESHOLD rows they are written to a '_data.csv'
+    file instead of a Data sheet and linked from Summary.
+    
     Args:
-        df_data: Processed sales data DataFrame
+        conn: Open SQLite database connection
         df_summary: Summary statistics DataFrame
         output_file: Output Excel file path
+        run_ts: Report run timestamp (datetime)
+    
+    Returns:
+        Path of the raw data CSV, or None if the Data sheet was used
     """
     print(f"[INFO] Generating Excel report: {output_file}")
     
     try:
-        # Create Excel writer object
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            
-            # ===== SHEET 1: SUMMARY SHEET =====
-            print("[INFO] Creating Summary sheet...")
-            
-            # Write summary data
-            df_summary.to_excel(writer, sheet_name='Summary', index=False, startrow=4)
-            
-            # Get the workbook and summary sheet
-            workbook = writer.book
-            summary_sheet = writer.sheets['Summary']
-            
-            # Add title and metadata
-            summary_sheet['A1'] = 'SALES REPORT SUMMARY'
-            summary_sheet['A1'].font = Font(size=16, bold=True, color='FFFFFF')
-            summary_sheet['A1'].fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-            summary_sheet['A1'].alignment = Alignment(horizontal='center')
-            summary_sheet.merge_cells('A1:F1')
-            
-            summary_sheet['A2'] = f'Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-            summary_sheet['A2'].font = Font(italic=True)
-            
-            # Calculate and display totals
-            summary_sheet['A3'] = 'Overall Totals:'
-            summary_sheet['A3'].font = Font(bold=True)
-            summary_sheet['B3'] = f"Total Revenue: ${df_summary['total_revenue'].sum():,.2f}"
-            summary_sheet['D3'] = f"Total Quantity: {df_summary['total_quantity'].sum():,}"
-            
-            # Format header row
-            for cell in summary_sheet[5]:
-                cell.font = Font(bold=True, color='FFFFFF')
-                cell.fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-                cell.alignment = Alignment(horizontal='center')
-            
-            # Set column widths manually
-            summary_sheet.column_dimensions['A'].width = 20
-            summary_sheet.column_dimensions['B'].width = 15
-            summary_sheet.column_dimensions['C'].width = 15
-            summary_sheet.column_dimensions['D'].width = 18
-            summary_sheet.column_dimensions['E'].width = 18
-            summary_sheet.column_dimensions['F'].width = 18
-            
-            # ===== SHEET 2: RAW DATA SHEET =====
-            print("[INFO] Creating Data sheet...")
-            
-            # Write raw data
-            df_data.to_excel(writer, sheet_name='Data', index=False)
-            data_sheet = writer.sheets['Data']
-            
-            # Format header row
-            for cell in data_sheet[1]:
-                cell.font = Font(bold=True, color='FFFFFF')
-                cell.fill = PatternFill(start_color='70AD47', end_color='70AD47', fill_type='solid')
-                cell.alignment = Alignment(horizontal='center')
-            
-            # Set column widths for data sheet
-            for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I']:
-                data_sheet.column_dimensions[col].width = 15
+        # Create write-only workbook (rows are streamed, not kept in memory)
+        wb = Workbook(write_only=True)
+        wb.add_named_style(SUMMARY_HEADER_STYLE)
+        wb.add_named_style(DATA_HEADER_STYLE)
+        
+        # ===== SHEET 1: SUMMARY SHEET =====
+        print("[INFO] Creating Summary sheet...")
+        summary_sheet = wb.create_sheet('Summary')
+        
+        # Column widths must be set before any rows are written
+        for col, width in zip('ABCDEF', (20, 15, 15, 18, 18, 18)):
+            summary_sheet.column_dimensions[col].width = width
+        summary_sheet.merged_cells.ranges.add(CellRange('A1:F1'))
+        
+        # Add title and metadata
+        title = WriteOnlyCell(summary_sheet, value='SALES REPORT SUMMARY')
+        title.font = TITLE_FONT
+        title.fill = SUMMARY_FILL
+        title.alignment = CENTER
+        summary_sheet.append([title])
+        
+        generated = WriteOnlyCell(
+            summary_sheet,
+            value=f'Generated on: {run_ts.strftime("%Y-%m-%d %H:%M:%S")}'
+        )
+        generated.font = ITALIC_FONT
+        
+        # Link to the raw data CSV when it replaces the Data sheet
+        data_csv = None
+        if df_summary['total_sales'].sum() > DATA_CSV_THRESHOLD:
+            data_csv = os.path.splitext(output_file)[0] + '_data.csv'
+            csv_link = WriteOnlyCell(
+                summary_sheet, value=f'Raw data: {os.path.basename(data_csv)}'
+            )
+            csv_link.hyperlink = os.path.basename(data_csv)
+            csv_link.style = 'Hyperlink'
+            summary_sheet.append([generated, None, None, csv_link])
+        else:
+            summary_sheet.append([generated])
+        
+        # Calculate and display totals (both columns in one reduction)
+        totals = df_summary[['total_revenue', 'total_quantity']].sum()
+        totals_label = WriteOnlyCell(summary_sheet, value='Overall Totals:')
+        totals_label.font = BOLD_FONT
+        summary_sheet.append([
+            totals_label,
+            f"Total Revenue: ${totals['total_revenue']:,.2f}",
+            None,
+            f"Total Quantity: {int(totals['total_quantity']):,}",
+        ])
+        summary_sheet.append([])
+        
+        # Formatted header row
+        summary_sheet.append(
+            build_header_row(summary_sheet, df_summary.columns, SUMMARY_HEADER_STYLE)
+        )
+        
+        # Write summary data
+        for row in df_summary.itertuples(index=False, name=None):
+            summary_sheet.append(row)
         
         # ===== ADD CHARTS TO SUMMARY SHEET =====
         print("[INFO] Adding charts to report...")
-        add_charts_to_report(output_file, len(df_summary))
-        
-        print(f"[SUCCESS] Excel report generated: {output_file}")
         
-    except Exception as e:
-        print(f"[ERROR] Failed to generate Excel report: {e}")
-        sys.exit(1)
-
-def add_charts_to_report(excel_file, data_rows):
-    """
-    Add charts to the Excel report.
-    
-    Args:
-        excel_file: Path to Excel file
-        data_rows: Number of data rows in summary
-    """
-    try:
-        # Load the workbook
-        wb = load_workbook(excel_file)
-        summary_sheet = wb['Summary']
+        # Chart ranges on the Summary sheet (shared by both charts)
+        last_row = 5 + len(df_summary)
+        products = Reference(summary_sheet, min_col=1, min_row=5, max_row=last_row)
+        quantity = Reference(summary_sheet, min_col=4, min_row=4, max_row=last_row)
+        revenue = Reference(summary_sheet, min_col=5, min_row=4, max_row=last_row)
         
-        # ===== CHART 1: BAR CHART - Revenue by Product =====
+        # Chart 1: Bar chart - Revenue by Product
         bar_chart = BarChart()
         bar_chart.title = "Revenue by Product"
         bar_chart.x_axis.title = "Product"
         bar_chart.y_axis.title = "Total Revenue ($)"
         bar_chart.style = 10
-        
-        # Data for chart (columns: product_name and total_revenue)
-        products = Reference(summary_sheet, min_col=1, min_row=5, max_row=5+data_rows)
-        revenue = Reference(summary_sheet, min_col=5, min_row=4, max_row=5+data_rows)
-        
         bar_chart.add_data(revenue, titles_from_data=True)
         bar_chart.set_categories(products)
         bar_chart.height = 10
         bar_chart.width = 20
-        
-        # Add chart to sheet
         summary_sheet.add_chart(bar_chart, "H5")
         
-        # ===== CHART 2: LINE CHART - Quantity Sold by Product =====
+        # Chart 2: Line chart - Quantity Sold by Product
         line_chart = LineChart()
         line_chart.title = "Quantity Sold by Product"
         line_chart.x_axis.title = "Product"
         line_chart.y_axis.title = "Total Quantity"
         line_chart.style = 12
-        
-        # Data for chart
-        quantity = Reference(summary_sheet, min_col=4, min_row=4, max_row=5+data_rows)
-        
         line_chart.add_data(quantity, titles_from_data=True)
         line_chart.set_categories(products)
         line_chart.height = 10
         line_chart.width = 20
-        
-        # Add chart to sheet
         summary_sheet.add_chart(line_chart, "H22")
         
-        # Save workbook
-        wb.save(excel_file)
-        print("[SUCCESS] Charts added to report.")
+        # Raw data rows come straight from SQLite, already formatted
+        rows = fetch_report_rows(conn, text_dates=bool(data_csv))
+        columns = [col[0] for col in rows.description]
+        
+        if data_csv:
+            # ===== RAW DATA AS CSV (large reports) =====
+            print(f"[INFO] Writing raw data to CSV: {data_csv}")
+            with open(data_csv, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+        else:
+            # ===== SHEET 2: RAW DATA SHEET =====
+            print("[INFO] Creating Data sheet...")
+            data_sheet = wb.create_sheet('Data')
+            
+            # Set column widths for data sheet
+            for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I']:
+                data_sheet.column_dimensions[col].width = 15
+            
+            # Formatted header row
+            data_sheet.append(
+                build_header_row(data_sheet, columns, DATA_HEADER_STYLE)
+            )
+            
+            # Write raw data (write_only flushes each row to disk as it goes);
+            # sale_date becomes a real Excel date so it sorts and filters
+            for row in rows:
+                data_sheet.append(
+                    (row[0], date.fromordinal(EPOCH_ORDINAL + row[1])) + row[2:]
+                )
+        
+        wb.save(output_file)
+        print(f"[SUCCESS] Excel report generated: {output_file}")
+        return data_csv
         
     except Exception as e:
-        print(f"[ERROR] Failed to add charts: {e}")
+        print(f"[ERROR] Failed to generate Excel report: {e}")
+        sys.exit(1)
 
 # ============================================
 # SECTION 5: EMAIL SENDING
 # ============================================
-def send_email(config, report_file):
+def send_email(config, report_file, run_ts, data_file=None):
     """
     Send Excel report via email using SMTP.
     
     Args:
         config: Configuration object with email settings
         report_file: Path to Excel report file
+        run_ts: Report run timestamp (datetime)
+        data_file: Path to the raw data CSV for large reports (sent gzipped)
     """
     print("[INFO] Preparing to send email...")
     
@@ -333,51 +477,72 @@ def send_email(config, report_file):
         smtp_port = int(config['EMAIL']['smtp_port'])
         
         # Create email message
-        msg = MIMEMultipart()
+        msg = EmailMessage()
         msg['From'] = sender_email
         msg['To'] = receiver_email
-        msg['Subject'] = f"Sales Report - {datetime.now().strftime('%Y-%m-%d')}"
+        msg['Subject'] = f"Sales Report - {run_ts.strftime('%Y-%m-%d')}"
+        
+        # Describe where the transaction details are
+        if data_file:
+            data_line = (
+                f"- {os.path.basename(data_file)}.gz with all transactions "
+                "(extract it next to the report for the Summary link to work)"
+            )
+        else:
+            data_line = "- Detailed data sheet with all transactions"
         
         # Email body
         body = f"""
         Hello,
         
-        Please find attached the automated sales report generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.
+        Please find attached the automated sales report generated on {run_ts.strftime('%Y-%m-%d %H:%M:%S')}.
         
         The report includes:
         - Summary sheet with aggregated sales data
-        - Detailed data sheet with all transactions
+        {data_line}
         - Visual charts for quick insights
         
         Best regards,
         Automated Reporting System
         """
         
-        msg.attach(MIMEText(body, 'plain'))
+        msg.set_content(body)
         
-        # Attach Excel file
+        # Attach Excel file (the content manager base64-encodes it once)
         print(f"[INFO] Attaching file: {report_file}")
         with open(report_file, 'rb') as attachment:
-            part = MIMEBase('application', 'octet-stream')
-            part.set_payload(attachment.read())
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename= {os.path.basename(report_file)}'
+            msg.add_attachment(
+                attachment.read(),
+                maintype='application',
+                subtype='vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                filename=os.path.basename(report_file)
             )
-            msg.attach(part)
-        
-        # Connect to SMTP server and send email
-        print(f"[INFO] Connecting to SMTP server: {smtp_server}:{smtp_port}")
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Enable encryption
         
-        print("[INFO] Logging in to email account...")
-        server.login(sender_email, sender_password)
+        # Attach the raw data CSV (gzip-compressed) when it replaced the Data sheet
+        if data_file:
+            print(f"[INFO] Attaching file: {data_file}.gz")
+            # Stream the CSV through gzip so it is never fully in memory
+            compressed = io.BytesIO()
+            with open(data_file, 'rb') as attachment, \
+                    gzip.GzipFile(fileobj=compressed, mode='wb') as gz:
+                shutil.copyfileobj(attachment, gz)
+            msg.add_attachment(
+                compressed.getvalue(),
+                maintype='application',
+                subtype='gzip',
+                filename=os.path.basename(data_file) + '.gz'
+            )
         
-        print("[INFO] Sending email...")
-        server.send_message(msg)
-        server.quit()
+        # Connect to SMTP server and send email (socket closed on exit)
+        print(f"[INFO] Connecting to SMTP server: {smtp_server}:{smtp_port}")
+        with smtplib.SMTP(smtp_server, smtp_port, timeout=30) as server:
+            server.starttls()  # Enable encryption
+            
+            print("[INFO] Logging in to email account...")
+            server.login(sender_email, sender_password)
+            
+            print("[INFO] Sending email...")
+            server.send_message(msg)
         
         print(f"[SUCCESS] Email sent successfully to {receiver_email}")
         
@@ -395,7 +560,9 @@ def main():
     print("="*60)
     print("AUTOMATED EXCEL REPORTING SYSTEM")
     print("="*60)
-    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    # Single run timestamp shared by the filename, report and email
+    run_ts = datetime.now()
+    print(f"Started at: {run_ts.strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*60)
     
     try:
@@ -405,27 +572,30 @@ def main():
         # Step 2: Get database path from config
         db_path = config['DATABASE']['db_path']
         
-        # Step 3: Fetch sales data from database
-        df_raw = fetch_sales_data(db_path)
-        
-        # Step 4: Get sales summary with aggregations
-        df_summary = get_sales_summary(db_path)
-        
-        # Step 5: Process data with pandas
-        df_processed = process_data(df_raw)
-        
-        # Step 6: Generate output filename
-        output_file = config['REPORT']['output_path']
-        # Add timestamp to filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_file = output_file.replace('.xlsx', f'_{timestamp}.xlsx')
-        
-        # Step 7: Generate Excel report
-        generate_excel_report(df_processed, df_summary, output_file)
+        # Step 3: Open a single database connection for the whole report
+        conn = connect_database(db_path)
+        try:
+            # Step 4: Fetch sales data from database
+            df_raw = fetch_sales_data(conn)
+            
+            # Step 5: Get sales summary with aggregations (pandas)
+            engine = config['REPORT'].get('groupby_engine', fallback='cython')
+            df_summary = summarize_sales(df_raw, 'numba' if engine == 'numba' else None)
+            
+            # Step 6: Generate output filename
+            output_file = config['REPORT']['output_path']
+            # Add timestamp to filename
+            timestamp = run_ts.strftime('%Y%m%d_%H%M%S')
+            output_file = output_file.replace('.xlsx', f'_{timestamp}.xlsx')
+            
+            # Step 7: Generate Excel report (Data sheet streamed from SQLite)
+            data_file = generate_excel_report(conn, df_summary, output_file, run_ts)
+        finally:
+            conn.close()
         
         # Step 8: Send email (if configured)
         if config['EMAIL'].getboolean('send_email', fallback=True):
-            send_email(config, output_file)
+            send_email(config, output_file, run_ts, data_file)
         else:
             print("[INFO] Email sending is disabled in config.")
         
@@ -9,8 +9,9 @@ Usage: python setup_database.py
 """
 
 import sqlite3
-import random
-from datetime import datetime, timedelta
+import sys
+import numpy as np
+from datetime import date, datetime, timedelta
 
 def create_database():
     """
@@ -27,7 +28,7 @@ def create_database():
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS sales (
         sale_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        sale_date TEXT NOT NULL,
+        sale_date INTEGER NOT NULL,
         product_name TEXT NOT NULL,
         category TEXT NOT NULL,
         quantity INTEGER NOT NULL,
@@ -36,6 +37,14 @@ def create_database():
     )
     ''')
     
+    # Refuse to append to a database created with the old TEXT sale_date
+    columns = {row[1]: row[2] for row in cursor.execute('PRAGMA table_info(sales)')}
+    if columns.get('sale_date', '').upper() != 'INTEGER':
+        print("ERROR: sales_data.db uses the old TEXT sale_date column.")
+        print("Delete sales_data.db and run this script again.")
+        conn.close()
+        sys.exit(1)
+    
     # Sample products and categories
     products = [
         ('Laptop', 'Electronics', 899.99),
@@ -52,34 +61,41 @@ def create_database():
     
     # Generate sample sales data for the past 90 days
     print("Generating sample sales data...")
-    sales_data = []
+    rng = np.random.default_rng()
     start_date = datetime.now() - timedelta(days=90)
     
-    for day in range(90):
-        current_date = start_date + timedelta(days=day)
-        date_str = current_date.strftime('%Y-%m-%d')
-        
-        # Generate random number of sales per day (5-15)
-        num_sales = random.randint(5, 15)
-        
-        for _ in range(num_sales):
-            # Pick random product
-            product_name, category, unit_price = random.choice(products)
-            
-            # Random quantity (1-5)
-            quantity = random.randint(1, 5)
-            
-            # Calculate total
-            total_amount = quantity * unit_price
-            
-            sales_data.append((
-                date_str,
-                product_name,
-                category,
-                quantity,
-                unit_price,
-                total_amount
-            ))
+    # Dates are stored as days since 1970-01-01
+    start_day = (start_date.date() - date(1970, 1, 1)).days
+    dates = np.arange(start_day, start_day + 90)
+    
+    # Generate random number of sales per day (5-15)
+    sales_per_day = rng.integers(5, 16, len(dates))
+    day_idx = np.repeat(np.arange(len(dates)), sales_per_day)
+    num_sales = len(day_idx)
+    
+    # Pick random products and quantities (1-5) for all sales at once
+    prod_idx = rng.integers(0, len(products), num_sales)
+    qty = rng.integers(1, 6, num_sales)
+    
+    names, categories, prices = zip(*products)
+    unit_prices = np.array(prices)[prod_idx]
+    
+    # Calculate totals
+    totals = qty * unit_prices
+    
+    sales_data = list(zip(
+        dates[day_idx].tolist(),
+        np.array(names, dtype=object)[prod_idx],
+        np.array(categories, dtype=object)[prod_idx],
+        qty.tolist(),
+        unit_prices.tolist(),
+        totals.tolist()
+    ))
+    
+    # Bulk load: no rollback journal, no fsync, one explicit transaction
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('BEGIN')
     
     # Insert data into table
     cursor.executemany('''
@@ -87,7 +103,15 @@ def create_database():
     VALUES (?, ?, ?, ?, ?, ?)
     ''', sales_data)
     
-    # Commit changes and close connection
+    # Build indexes after the bulk load: one for date filters and a
+    # covering index for the product summary
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(sale_date)')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_sales_product_summary
+    ON sales(product_name, category, total_amount, quantity)
+    ''')
+    
+    # Commit all inserts at once
     conn.commit()
     
     # Display summary